@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 
 # --------------------------
 # 1. Авторизация по e-mail
@@ -105,6 +106,15 @@ def parse_suppliers_columns(columns):
     return suppliers
 
 
+def file_digest(file_bytes: bytes) -> str:
+    return hashlib.sha1(file_bytes).hexdigest()
+
+
+def export_fingerprint(parts) -> str:
+    """Дешёвый ключ кэша экспорта по входным данным, а не по итоговой таблице."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
 if uploaded_file:
     try:
         df = pd.read_excel(uploaded_file)
@@ -226,16 +236,16 @@ if uploaded_file:
             st.subheader("Все поставщики (по возрастанию цены)")
             st.dataframe(result, use_container_width=True)
 
-        # Экспорт в Excel с форматированием
-        @st.cache_data
-        def to_excel_bytes(df_out: pd.DataFrame) -> bytes:
+        # Экспорт в Excel с форматированием (по кнопке, кэш по отпечатку входов)
+        @st.cache_data(max_entries=8, show_spinner=False)
+        def to_excel_bytes(fingerprint: str, _df_out: pd.DataFrame) -> bytes:
             from io import BytesIO
             from openpyxl.styles import Font
             from openpyxl.utils import get_column_letter
 
             out = BytesIO()
             with pd.ExcelWriter(out, engine="openpyxl") as writer:
-                df_out.to_excel(writer, index=False, sheet_name="Результаты")
+                _df_out.to_excel(writer, index=False, sheet_name="Результаты")
                 ws = writer.sheets["Результаты"]
 
                 # Закрепляем верхнюю строку и первый столбец
@@ -284,14 +294,24 @@ if uploaded_file:
             out.seek(0)
             return out.getvalue()
 
-        st.download_button(
-            label="Скачать результат в Excel",
-            data=to_excel_bytes(result),
-            file_name=(
-                "best_suppliers.xlsx" if mode == "Лучший поставщик" else "all_suppliers_sorted.xlsx"
-            ),
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+        export_parts = [file_digest(uploaded_file.getvalue()), mode]
+        if mode != "Лучший поставщик":
+            # порядок групп влияет на результат только в режиме «Все поставщики»
+            export_parts.append(group_by_original)
+        export_fp = export_fingerprint(export_parts)
+        export_ready = st.session_state.get("compare_export_fp") == export_fp
+        if not export_ready and st.button("📊 Сформировать Excel"):
+            st.session_state.compare_export_fp = export_fp
+            export_ready = True
+        if export_ready:
+            st.download_button(
+                label="Скачать результат в Excel",
+                data=to_excel_bytes(export_fp, result),
+                file_name=(
+                    "best_suppliers.xlsx" if mode == "Лучший поставщик" else "all_suppliers_sorted.xlsx"
+                ),
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
 
     except Exception as e:
         st.error(f"Ошибка при обработке файла: {e}")
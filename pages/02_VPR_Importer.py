@@ -3,7 +3,10 @@ import pandas as pd
 import io
 import os
 import re
-from typing import List, Optional, Dict, Tuple
+import csv
+import codecs
+import hashlib
+from typing import List, Optional, Dict, Tuple, Iterator, Iterable, Set
 # --------------------------
 # 1. Авторизация по e-mail
 # --------------------------
@@ -65,6 +68,10 @@ st.caption("Загрузите заявку с артикулами, затем
 
 # ---------- Helpers ----------
 PRICE_RE = re.compile(r"[\d\s.,]+")
+NON_ART_RE = r"[^A-Z0-9]"
+
+# Потоковый режим: сколько строк прайса держим в памяти за раз
+STREAM_CHUNK_ROWS = 50_000
 
 COL_ART = "Артикул"
 COL_QTY = "Кол-во"
@@ -84,7 +91,12 @@ SUPPORTED_HINTS = {
 def normalize_part(s: str) -> str:
     if not isinstance(s, str):
         s = str(s)
-    return re.sub(r"[^A-Z0-9]", "", s.upper())
+    return re.sub(NON_ART_RE, "", s.upper())
+
+
+def normalize_part_series(s: pd.Series) -> pd.Series:
+    # То же, что normalize_part, но векторно — для целых чанков прайса
+    return s.astype(str).str.upper().str.replace(NON_ART_RE, "", regex=True)
 
 
 def parse_price(val, decimal:"," = ",") -> Optional[float]:
@@ -144,6 +156,153 @@ def parse_pdf_tables(file_bytes: bytes) -> List[pd.DataFrame]:
     return frames
 
 
+def _csv_read_kwargs(file_bytes: bytes) -> Dict:
+    # Кодировку и разделитель угадываем по началу файла; всё читаем как текст,
+    # чтобы цены разбирались parse_price с выбранным десятичным разделителем
+    sample = file_bytes[:65536]
+    try:
+        text = codecs.getincrementaldecoder("utf-8-sig")().decode(sample)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        text = sample.decode("cp1251", errors="replace")
+        encoding = "cp1251"
+    try:
+        sep = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=";,\t|").delimiter
+    except csv.Error:
+        sep = ";"
+    return {"sep": sep, "encoding": encoding, "dtype": str}
+
+
+def parse_csv(file_bytes: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(file_bytes), **_csv_read_kwargs(file_bytes))
+
+
+def _header_names(raw) -> List[str]:
+    names: List[str] = []
+    for i, h in enumerate(raw):
+        name = str(h).strip() if h is not None else ""
+        if not name or name in names:
+            name = f"Unnamed: {i}"
+        names.append(name)
+    return names
+
+
+def read_csv_header(file_bytes: bytes) -> List[str]:
+    return list(pd.read_csv(io.BytesIO(file_bytes), nrows=0, **_csv_read_kwargs(file_bytes)).columns)
+
+
+def iter_csv_chunks(file_bytes: bytes, chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(io.BytesIO(file_bytes), chunksize=chunk_rows, **_csv_read_kwargs(file_bytes)) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def _row_width(row) -> int:
+    # Ширина строки без хвостовых пустых ячеек
+    for i in range(len(row), 0, -1):
+        v = row[i - 1]
+        if v is not None and str(v).strip() != "":
+            return i
+    return 0
+
+
+def _xlsx_open_head(ws, chunk_rows: int) -> Tuple[List[str], List[list], Iterator]:
+    # Пустые строки в начале пропускаем, первая непустая — заголовок.
+    # Ширину берём по самой широкой строке первого чанка, а не по заголовку:
+    # прайсы часто начинаются с однострочного названия вроде «Прайс ООО …»
+    rows_it = ws.iter_rows(values_only=True)
+    header = None
+    for row in rows_it:
+        if _row_width(row):
+            header = row
+            break
+    if header is None:
+        return [], [], iter(())
+    first: List[list] = []
+    for row in rows_it:
+        first.append(row)
+        if len(first) >= chunk_rows:
+            break
+    n = max([_row_width(header)] + [_row_width(r) for r in first])
+    header = list(header[:n]) + [None] * (n - len(header))
+    return _header_names(header), first, rows_it
+
+
+def read_xlsx_header(file_bytes: bytes) -> List[str]:
+    from openpyxl import load_workbook
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        # Первый лист, как у pd.read_excel; размеры листа в файле бывают неверными
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        columns, _, _ = _xlsx_open_head(ws, STREAM_CHUNK_ROWS)
+        return columns
+    finally:
+        wb.close()
+
+
+def iter_xlsx_chunks(file_bytes: bytes, chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    # read_only-режим openpyxl отдаёт строки итератором, не собирая лист целиком
+    from openpyxl import load_workbook
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        columns, buf, rows_it = _xlsx_open_head(ws, chunk_rows)
+        if not columns:
+            return
+        n = len(columns)
+        buf = [list(row[:n]) + [None] * (n - len(row)) for row in buf]
+        for row in rows_it:
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=columns, dtype=object)
+                buf = []
+            buf.append(list(row[:n]) + [None] * (n - len(row)))
+        if buf:
+            yield pd.DataFrame(buf, columns=columns, dtype=object)
+    finally:
+        wb.close()
+
+
+def read_pdf_header(file_bytes: bytes) -> List[str]:
+    if not HAS_PDFPLUMBER:
+        return []
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        for page in pdf.pages:
+            for tbl in page.extract_tables() or []:
+                if tbl and len(tbl) >= 2:
+                    return _header_names(tbl[0])
+            page.flush_cache()
+    return []
+
+
+def iter_pdf_chunks(file_bytes: bytes, columns: List[str], odd_tables: List[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    # Постранично: все таблицы той же ширины считаем продолжением одной таблицы,
+    # повторные строки заголовка пропускаем, кэш страницы сразу освобождаем.
+    # Таблицы другой ширины складываем в odd_tables — их колонки выбираются отдельно
+    if not HAS_PDFPLUMBER:
+        return
+    n = len(columns)
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        for page in pdf.pages:
+            rows = []
+            for tbl in page.extract_tables() or []:
+                if not tbl:
+                    continue
+                if len(tbl[0]) != n:
+                    if len(tbl) >= 2:
+                        headers = [str(h).strip() if h is not None else "" for h in tbl[0]]
+                        odd_tables.append(pd.DataFrame(tbl[1:], columns=headers))
+                    continue
+                for raw in tbl:
+                    if not raw or len(raw) != n or _header_names(raw) == columns:
+                        continue
+                    rows.append(raw)
+            page.flush_cache()
+            if rows:
+                yield pd.DataFrame(rows, columns=columns, dtype=object)
+
+
 def normalize_rows(df: pd.DataFrame, art_col: str, price_col: str, brand_col: Optional[str], vendor: str, src_label: str, decimal_sep: str) -> pd.DataFrame:
     out_rows = []
     for _, r in df.iterrows():
@@ -166,6 +325,34 @@ def normalize_rows(df: pd.DataFrame, art_col: str, price_col: str, brand_col: Op
         out[COL_NORM] = out[COL_ART].apply(normalize_part)
     return out
 
+
+def filter_offers_stream(chunks: Iterable[pd.DataFrame], art_col: str, price_col: str, brand_col: Optional[str], vendor: str, src_label: str, decimal_sep: str, base_norms: Set[str]) -> pd.DataFrame:
+    # Из каждого чанка оставляем только артикулы заявки — память зависит от размера заявки, а не прайса
+    parts = []
+    for chunk in chunks:
+        chunk = chunk[chunk[art_col].notna()]
+        if chunk.empty:
+            continue
+        keep = chunk[normalize_part_series(chunk[art_col]).isin(base_norms)]
+        if keep.empty:
+            continue
+        offers = normalize_rows(keep, art_col, price_col, brand_col, vendor, src_label, decimal_sep)
+        if not offers.empty:
+            parts.append(offers)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def file_digest(file_bytes: bytes) -> str:
+    return hashlib.sha1(file_bytes).hexdigest()
+
+
+def export_fingerprint(parts: List[Tuple]) -> str:
+    # Дешёвый ключ экспорта: хэши файлов + выбранные колонки/опции, а не содержимое итоговой таблицы
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+# Всё, от чего зависит итоговая таблица, — для ключа кэша экспорта (п.4)
+export_fp_parts: List[Tuple] = []
+
 # =============================
 # 1) БАЗОВАЯ РАСЦЕНКА (обязательно)
 # =============================
@@ -175,7 +362,8 @@ base_file = st.file_uploader("Базовая расценка (Excel)", type=["x
 base_df = None
 if base_file:
     try:
-        base_raw = parse_excel(base_file.read())
+        base_bytes = base_file.read()
+        base_raw = parse_excel(base_bytes)
         cols = list(base_raw.columns)
         art_col = suggest_column(cols, SUPPORTED_HINTS[COL_ART]) or cols[0]
         qty_col = suggest_column(cols, SUPPORTED_HINTS[COL_QTY])
@@ -190,6 +378,7 @@ if base_file:
         else:
             base_df[COL_QTY] = None
         base_df[COL_NORM] = base_df[COL_ART].apply(normalize_part)
+        export_fp_parts.append(("base", file_digest(base_bytes), art_col, qty_col))
         st.success(f"Загружено позиций: {len(base_df)}")
         st.dataframe(base_df.head(30), use_container_width=True)
     except Exception as e:
@@ -199,10 +388,20 @@ if base_file:
 # 2) ПРАЙСЫ ПОСТАВЩИКОВ (VPR)
 # =============================
 st.subheader("2) Загрузите расценку от поставщиков")
-st.caption("Поддерживаются Excel (XLS/XLSX) и цифровые PDF. Сканам требуется OCR (не входит).")
-vpr_files = st.file_uploader("Прайсы (Excel/PDF)", type=["xlsx","xls","pdf"], accept_multiple_files=True, key="vprs")
+st.caption("Поддерживаются Excel (XLS/XLSX), CSV и цифровые PDF. Сканам требуется OCR (не входит).")
+vpr_files = st.file_uploader("Прайсы (Excel/CSV/PDF)", type=["xlsx","xls","csv","pdf"], accept_multiple_files=True, key="vprs")
 decimal_sep = st.selectbox("Десятичный разделитель в ценах VPR", [",", "."], index=0)
 try_pdf = st.checkbox("Извлекать таблицы из PDF", value=True and HAS_PDFPLUMBER)
+stream_mode = st.checkbox(
+    "Потоковое чтение больших прайсов",
+    value=False,
+    disabled=base_df is None,
+    help=(
+        "Прайс читается частями, и сразу отбрасываются артикулы, которых нет в заявке. "
+        "Нужна загруженная заявка (п.1). XLS читается целиком, для PDF используется одна таблица на весь файл."
+    ),
+) and base_df is not None
+base_norms: Set[str] = set(base_df[COL_NORM]) if base_df is not None else set()
 
 all_offers: List[pd.DataFrame] = []
 if vpr_files:
@@ -211,36 +410,101 @@ if vpr_files:
             vendor_default = os.path.splitext(f.name)[0]
             vendor_val = st.text_input("Имя поставщика", value=vendor_default, key=f"vendor::{f.name}")
             file_bytes = f.read()
+            file_hash = file_digest(file_bytes)
             src_label = f.name
 
-            if f.name.lower().endswith((".xlsx",".xls")):
+            if f.name.lower().endswith((".xlsx",".xls",".csv")):
+                is_csv = f.name.lower().endswith(".csv")
+                # старый XLS openpyxl не читает построчно — его грузим целиком
+                streaming = stream_mode and f.name.lower().endswith((".xlsx",".csv"))
+                df = None
                 try:
-                    df = parse_excel(file_bytes)
+                    if streaming:
+                        cols = read_csv_header(file_bytes) if is_csv else read_xlsx_header(file_bytes)
+                    else:
+                        df = parse_csv(file_bytes) if is_csv else parse_excel(file_bytes)
+                        cols = list(df.columns)
                 except Exception as e:
-                    st.error(f"Ошибка чтения Excel: {e}")
+                    st.error(f"Ошибка чтения {'CSV' if is_csv else 'Excel'}: {e}")
+                    continue
+                if not cols:
+                    st.warning("Не найдена строка заголовка: лист пустой.")
                     continue
-                cols = list(df.columns)
                 art_guess = suggest_column(cols, SUPPORTED_HINTS[COL_ART]) or (cols[0] if cols else None)
                 price_guess = suggest_column(cols, SUPPORTED_HINTS[COL_PRICE]) or (cols[1] if len(cols)>1 else None)
                 brand_guess = suggest_column(cols, SUPPORTED_HINTS[COL_BRAND])
+                # заголовки в потоковом режиме именуются иначе, чем у pandas — ключи раздельные
+                key_sfx = "::stream" if streaming else ""
                 c1,c2,c3 = st.columns(3)
                 with c1:
-                    art_col = st.selectbox("Столбец артикула", options=cols, index=(cols.index(art_guess) if art_guess in cols else 0), key=f"art::{f.name}")
+                    art_col = st.selectbox("Столбец артикула", options=cols, index=(cols.index(art_guess) if art_guess in cols else 0), key=f"art::{f.name}{key_sfx}")
                 with c2:
-                    price_col = st.selectbox("Столбец цены", options=cols, index=(cols.index(price_guess) if price_guess in cols else (1 if len(cols)>1 else 0)), key=f"price::{f.name}")
+                    price_col = st.selectbox("Столбец цены", options=cols, index=(cols.index(price_guess) if price_guess in cols else (1 if len(cols)>1 else 0)), key=f"price::{f.name}{key_sfx}")
                 with c3:
-                    brand_col = st.selectbox("Столбец производителя", options=["<нет>"]+cols, index=(0 if brand_guess is None else cols.index(brand_guess)+1), key=f"brand::{f.name}")
-                offers = normalize_rows(df, art_col, price_col, (None if brand_col=="<нет>" else brand_col), vendor_val, src_label, decimal_sep)
-                st.write(f"Найдено строк с ценой: **{len(offers)}**")
+                    brand_col = st.selectbox("Столбец производителя", options=["<нет>"]+cols, index=(0 if brand_guess is None else cols.index(brand_guess)+1), key=f"brand::{f.name}{key_sfx}")
+                brand_sel = None if brand_col=="<нет>" else brand_col
+                if streaming:
+                    chunks = iter_csv_chunks(file_bytes) if is_csv else iter_xlsx_chunks(file_bytes)
+                    try:
+                        offers = filter_offers_stream(chunks, art_col, price_col, brand_sel, vendor_val, src_label, decimal_sep, base_norms)
+                    except Exception as e:
+                        st.error(f"Ошибка потокового чтения: {e}")
+                        continue
+                    st.write(f"Найдено строк с ценой по артикулам заявки: **{len(offers)}**")
+                else:
+                    offers = normalize_rows(df, art_col, price_col, brand_sel, vendor_val, src_label, decimal_sep)
+                    st.write(f"Найдено строк с ценой: **{len(offers)}**")
                 if not offers.empty:
                     st.dataframe(offers.head(20), use_container_width=True)
                     all_offers.append(offers)
+                    export_fp_parts.append((src_label, file_hash, vendor_val, art_col, price_col, brand_col, streaming))
+                elif streaming:
+                    st.warning("Цены по артикулам заявки не найдены.")
                 else:
                     st.warning("Не удалось распознать цены. Проверьте выбор колонок и десятичный разделитель.")
 
             elif f.name.lower().endswith(".pdf"):
                 if not (try_pdf and HAS_PDFPLUMBER):
                     st.warning("PDF не обработан: нет pdfplumber или выключено извлечение.")
+                    continue
+                tables: List[pd.DataFrame] = []
+                if stream_mode:
+                    # Одна таблица на весь файл: колонки выбираем по заголовку первой таблицы
+                    try:
+                        cols = read_pdf_header(file_bytes)
+                    except Exception as e:
+                        st.error(f"Ошибка чтения PDF: {e}")
+                        continue
+                    if not cols:
+                        st.warning("Таблицы в PDF не найдены.")
+                        continue
+                    art_guess = suggest_column(cols, SUPPORTED_HINTS[COL_ART]) or cols[0]
+                    price_guess = suggest_column(cols, SUPPORTED_HINTS[COL_PRICE]) or (cols[1] if len(cols)>1 else cols[0])
+                    brand_guess = suggest_column(cols, SUPPORTED_HINTS[COL_BRAND])
+                    c1,c2,c3 = st.columns(3)
+                    with c1:
+                        art_col = st.selectbox("Столбец артикула", options=cols, index=(cols.index(art_guess) if art_guess in cols else 0), key=f"pdf_art::{f.name}::stream")
+                    with c2:
+                        price_col = st.selectbox("Столбец цены", options=cols, index=(cols.index(price_guess) if price_guess in cols else (1 if len(cols)>1 else 0)), key=f"pdf_price::{f.name}::stream")
+                    with c3:
+                        brand_col = st.selectbox("Столбец производителя", options=["<нет>"]+cols, index=(0 if brand_guess is None else cols.index(brand_guess)+1), key=f"pdf_brand::{f.name}::stream")
+                    try:
+                        offers = filter_offers_stream(iter_pdf_chunks(file_bytes, cols, tables), art_col, price_col, (None if brand_col=="<нет>" else brand_col), vendor_val, src_label, decimal_sep, base_norms)
+                    except Exception as e:
+                        st.error(f"Ошибка потокового чтения PDF: {e}")
+                        continue
+                    st.write(f"Найдено строк с ценой по артикулам заявки: **{len(offers)}**")
+                    if not offers.empty:
+                        st.dataframe(offers.head(20), use_container_width=True)
+                        all_offers.append(offers)
+                        export_fp_parts.append((src_label, file_hash, vendor_val, art_col, price_col, brand_col, True))
+                    else:
+                        st.warning("Цены по артикулам заявки не найдены.")
+                    if tables:
+                        st.warning(
+                            f"Таблиц с другим числом колонок: {len(tables)} "
+                            f"(строк: {sum(len(t) for t in tables)}). Выберите колонки для них ниже."
+                        )
                 else:
                     try:
                         tables = parse_pdf_tables(file_bytes)
@@ -249,29 +513,32 @@ if vpr_files:
                         tables = []
                     if not tables:
                         st.warning("Таблицы в PDF не найдены.")
-                    for idx, df in enumerate(tables, start=1):
-                        with st.expander(f"Таблица {idx}"):
-                            cols = list(df.columns)
-                            if not cols:
-                                st.warning("Пустая таблица.")
-                                continue
-                            art_guess = suggest_column(cols, SUPPORTED_HINTS[COL_ART]) or cols[0]
-                            price_guess = suggest_column(cols, SUPPORTED_HINTS[COL_PRICE]) or (cols[1] if len(cols)>1 else cols[0])
-                            brand_guess = suggest_column(cols, SUPPORTED_HINTS[COL_BRAND])
-                            c1,c2,c3 = st.columns(3)
-                            with c1:
-                                art_col = st.selectbox("Столбец артикула", options=cols, index=(cols.index(art_guess) if art_guess in cols else 0), key=f"pdf_art::{f.name}::{idx}")
-                            with c2:
-                                price_col = st.selectbox("Столбец цены", options=cols, index=(cols.index(price_guess) if price_guess in cols else (1 if len(cols)>1 else 0)), key=f"pdf_price::{f.name}::{idx}")
-                            with c3:
-                                brand_col = st.selectbox("Столбец производителя", options=["<нет>"]+cols, index=(0 if brand_guess is None else cols.index(brand_guess)+1), key=f"pdf_brand::{f.name}::{idx}")
-                            offers = normalize_rows(df, art_col, price_col, (None if brand_col=="<нет>" else brand_col), vendor_val, f"{src_label} :: Таблица {idx}", decimal_sep)
-                            st.write(f"Найдено строк с ценой: **{len(offers)}**")
-                            if not offers.empty:
-                                st.dataframe(offers.head(20), use_container_width=True)
-                                all_offers.append(offers)
-                            else:
-                                st.warning("В этой таблице цены не распознаны.")
+                # в потоковом режиме здесь только таблицы, не совпавшие по ширине с первой
+                tbl_sfx = "::stream" if stream_mode else ""
+                for idx, df in enumerate(tables, start=1):
+                    with st.expander(f"Таблица {idx}"):
+                        cols = list(df.columns)
+                        if not cols:
+                            st.warning("Пустая таблица.")
+                            continue
+                        art_guess = suggest_column(cols, SUPPORTED_HINTS[COL_ART]) or cols[0]
+                        price_guess = suggest_column(cols, SUPPORTED_HINTS[COL_PRICE]) or (cols[1] if len(cols)>1 else cols[0])
+                        brand_guess = suggest_column(cols, SUPPORTED_HINTS[COL_BRAND])
+                        c1,c2,c3 = st.columns(3)
+                        with c1:
+                            art_col = st.selectbox("Столбец артикула", options=cols, index=(cols.index(art_guess) if art_guess in cols else 0), key=f"pdf_art::{f.name}::{idx}{tbl_sfx}")
+                        with c2:
+                            price_col = st.selectbox("Столбец цены", options=cols, index=(cols.index(price_guess) if price_guess in cols else (1 if len(cols)>1 else 0)), key=f"pdf_price::{f.name}::{idx}{tbl_sfx}")
+                        with c3:
+                            brand_col = st.selectbox("Столбец производителя", options=["<нет>"]+cols, index=(0 if brand_guess is None else cols.index(brand_guess)+1), key=f"pdf_brand::{f.name}::{idx}{tbl_sfx}")
+                        offers = normalize_rows(df, art_col, price_col, (None if brand_col=="<нет>" else brand_col), vendor_val, f"{src_label} :: Таблица {idx}", decimal_sep)
+                        st.write(f"Найдено строк с ценой: **{len(offers)}**")
+                        if not offers.empty:
+                            st.dataframe(offers.head(20), use_container_width=True)
+                            all_offers.append(offers)
+                            export_fp_parts.append((f"{src_label} :: Таблица {idx}", file_hash, vendor_val, art_col, price_col, brand_col, stream_mode))
+                        else:
+                            st.warning("В этой таблице цены не распознаны.")
 
 # =============================
 # 3) СВЯЗЫВАНИЕ С БАЗОЙ -> WIDE
@@ -344,13 +611,14 @@ st.dataframe(wide, use_container_width=True)
 # 4) Экспорт в Excel
 # ==================
 from io import BytesIO
-@st.cache_data
-def df_to_xlsx_bytes(df_out: pd.DataFrame) -> bytes:
+# собирается по кнопке; _df_out не хэшируется, ключ — отпечаток
+@st.cache_data(max_entries=8, show_spinner=False)
+def df_to_xlsx_bytes(fingerprint: str, _df_out: pd.DataFrame) -> bytes:
     from openpyxl.utils import get_column_letter
     from openpyxl.styles import Font
     bio = BytesIO()
     with pd.ExcelWriter(bio, engine="openpyxl") as writer:
-        df_out.to_excel(writer, index=False, sheet_name="VPR")
+        _df_out.to_excel(writer, index=False, sheet_name="VPR")
         ws = writer.sheets["VPR"]
         ws.freeze_panes = "B2"
         ws.auto_filter.ref = ws.dimensions
@@ -381,9 +649,15 @@ def df_to_xlsx_bytes(df_out: pd.DataFrame) -> bytes:
     bio.seek(0)
     return bio.getvalue()
 
-st.download_button(
-    label="📥 Скачать результат (Excel)",
-    data=df_to_xlsx_bytes(wide),
-    file_name="vpr_wide_by_base.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-)
+export_fp = export_fingerprint(export_fp_parts + [("opts", decimal_sep)])
+export_ready = st.session_state.get("vpr_export_fp") == export_fp
+if not export_ready and st.button("📊 Сформировать Excel"):
+    st.session_state.vpr_export_fp = export_fp
+    export_ready = True
+if export_ready:
+    st.download_button(
+        label="📥 Скачать результат (Excel)",
+        data=df_to_xlsx_bytes(export_fp, wide),
+        file_name="vpr_wide_by_base.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )